@@ -0,0 +1,226 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import requests
+
+CAL_API_BASE = "https://api.cal.com/v2"
+
+# Cal.com allows 120 requests/minute per API key; stay just below that.
+CAL_RATE_PER_S = 1.8
+CAL_BURST = 10
+# Writes (bookings, reschedules, cancellations) waiting or in flight at once.
+CAL_MAX_PENDING_WRITES = 8
+CAL_MAX_RETRIES = 3
+BACKOFF_BASE_S = 0.25
+BACKOFF_MAX_S = 4.0
+
+# Reads are idempotent and retried on these. Writes are only retried on 429,
+# where Cal.com rejected the request before processing it.
+READ_RETRY_STATUSES = {429, 500, 502, 503, 504}
+WRITE_RETRY_STATUSES = {429}
+
+
+class CalQueueFullError(Exception):
+    pass
+
+
+def _retry_after_seconds(response: requests.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    def __init__(self, rate_per_s: float, burst: int):
+        self.rate_per_s = rate_per_s
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds: float):
+        """Hold back every caller, e.g. after a 429 with Retry-After."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def acquire(self, give_up_at: float) -> bool:
+        """Take a token, waiting at most until give_up_at (time.monotonic)."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated_at) * self.rate_per_s
+                )
+                self._updated_at = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = max(
+                    self._paused_until - now,
+                    (1 - self._tokens) / self.rate_per_s,
+                )
+            if now + wait > give_up_at:
+                return False
+            time.sleep(wait)
+
+
+class CalScheduler:
+    """Shared outbound scheduler for all Cal.com requests of a worker.
+
+    Every request takes a token from one bucket, so concurrent calls stay under
+    the account's rate limit together. Reads are retried with jittered
+    exponential backoff (or Retry-After when given) and identical reads that
+    are already in flight are coalesced onto the same response. Writes are
+    bounded and rejected with CalQueueFullError instead of piling up. All
+    waiting counts against the caller's expires_at, an absolute
+    time.monotonic() deadline fixed before the request was handed to a
+    worker thread.
+    """
+
+    def __init__(
+        self,
+        rate_per_s: float = CAL_RATE_PER_S,
+        burst: int = CAL_BURST,
+        max_pending_writes: int = CAL_MAX_PENDING_WRITES,
+        max_retries: int = CAL_MAX_RETRIES,
+    ):
+        self.session = requests.Session()
+        self.max_retries = max_retries
+        self._bucket = TokenBucket(rate_per_s, burst)
+        self._write_slots = threading.BoundedSemaphore(max_pending_writes)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "requests": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "coalesced": 0,
+            "writes_rejected": 0,
+        }
+
+    def get(self, url: str, params: dict, headers: dict, expires_at: float) -> requests.Response:
+        key = (
+            url,
+            tuple(sorted((k, str(v)) for k, v in params.items())),
+            headers.get("Authorization"),
+        )
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            try:
+                return future.result(timeout=max(0.0, expires_at - time.monotonic()))
+            except TimeoutError:
+                raise requests.Timeout(f"Coalesced Cal.com request timed out: {url}")
+
+        try:
+            response = self._send(
+                "GET", url, expires_at, READ_RETRY_STATUSES, idempotent=True,
+                params=params, headers=headers,
+            )
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def post(self, url: str, json: dict, headers: dict, expires_at: float) -> requests.Response:
+        if not self._write_slots.acquire(blocking=False):
+            self.stats["writes_rejected"] += 1
+            raise CalQueueFullError("Cal.com write queue is full, try again shortly")
+        try:
+            return self._send(
+                "POST", url, expires_at, WRITE_RETRY_STATUSES, idempotent=False,
+                json=json, headers=headers,
+            )
+        finally:
+            self._write_slots.release()
+
+    def _send(self, method: str, url: str, expires_at: float, retry_statuses: set, idempotent: bool, **kwargs):
+        attempt = 0
+        while True:
+            if not self._bucket.acquire(expires_at):
+                raise requests.Timeout(f"Cal.com rate limit wait exceeded the timeout: {url}")
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                raise requests.Timeout(f"Cal.com request out of time: {url}")
+
+            self.stats["requests"] += 1
+            try:
+                response = self.session.request(method, url, timeout=remaining, **kwargs)
+            except requests.ConnectionError:
+                if not idempotent or attempt >= self.max_retries:
+                    raise
+                response = None
+
+            retry_after = _retry_after_seconds(response) if response is not None else None
+            if response is not None:
+                if response.status_code == 429:
+                    self.stats["rate_limited"] += 1
+                    if retry_after is not None:
+                        # Everyone backs off for the whole window, also when
+                        # this caller gives up below; Cal.com's window is
+                        # usually longer than any turn's budget.
+                        self._bucket.pause(retry_after)
+                if response.status_code not in retry_statuses or attempt >= self.max_retries:
+                    return response
+
+            delay = retry_after
+            if delay is None:
+                delay = random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** attempt))
+            if time.monotonic() + delay >= expires_at:
+                if response is None:
+                    raise requests.Timeout(f"Cal.com unreachable within the timeout: {url}")
+                return response
+
+            status = response.status_code if response is not None else "connection error"
+            print(f"[WARN] Cal.com {method} {url} -> {status}; retrying in {delay:.2f}s")
+            self.stats["retries"] += 1
+            attempt += 1
+            if response is not None and response.status_code == 429:
+                # The bucket holds this caller back along with everyone else.
+                if retry_after is None:
+                    self._bucket.pause(delay)
+            else:
+                time.sleep(delay)
+
+
+_scheduler: Optional[CalScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_cal_scheduler() -> CalScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = CalScheduler(
+                rate_per_s=float(os.environ.get("CAL_RATE_PER_S", CAL_RATE_PER_S)),
+                burst=int(os.environ.get("CAL_BURST", CAL_BURST)),
+                max_pending_writes=int(
+                    os.environ.get("CAL_MAX_PENDING_WRITES", CAL_MAX_PENDING_WRITES)
+                ),
+            )
+        return _scheduler
@@ -0,0 +1,51 @@
+import os
+import time
+from typing import Optional
+
+# Default wall-clock budget for a whole turn (all completions and tool calls).
+TURN_DEADLINE_S = 10.0
+
+
+class TurnDeadline:
+    """Per-turn time budget handed to every stage of draft_response.
+
+    Each stage asks for the remaining budget (optionally capped and minus a
+    reserve kept for the final spoken answer) instead of using its own fixed
+    timeout. The first reason the turn had to degrade is remembered for the
+    per-turn log line.
+    """
+
+    def __init__(self, budget_s: Optional[float] = None):
+        if budget_s is None:
+            budget_s = float(os.environ.get("TURN_DEADLINE_S", TURN_DEADLINE_S))
+        self.budget_s = budget_s
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + budget_s
+        self.degraded_reason: Optional[str] = None
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: Optional[float] = None, reserve: float = 0.0) -> float:
+        remaining = self.remaining() - reserve
+        if cap is not None:
+            remaining = min(cap, remaining)
+        return max(0.0, remaining)
+
+    def degrade(self, reason: str):
+        if self.degraded_reason is None:
+            self.degraded_reason = reason
+        print(f"[WARN] Turn degraded: {reason} (remaining={self.remaining():.2f}s)")
+
+    def log(self, response_id: int):
+        print(
+            f"[DEADLINE] response_id={response_id} budget_s={self.budget_s:.1f} "
+            f"elapsed_s={self.elapsed():.2f} remaining_s={self.remaining():.2f} "
+            f"degraded={self.degraded_reason or 'none'}"
+        )
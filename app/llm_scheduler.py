@@ -0,0 +1,131 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+# Lower value is served first.
+PRIORITY_LIVE = 0  # response_required: the caller is waiting for an answer
+PRIORITY_REMINDER = 1  # reminder_required: the caller went quiet
+PRIORITY_BACKGROUND = 2  # warm-up, prefetch, speculation
+
+PRIORITY_NAMES = {
+    PRIORITY_LIVE: "live",
+    PRIORITY_REMINDER: "reminder",
+    PRIORITY_BACKGROUND: "background",
+}
+
+LLM_MAX_IN_FLIGHT = 16
+# Background work is shed instead of queued once this many requests wait.
+LLM_MAX_QUEUED_BACKGROUND = 4
+
+
+class LlmOverloadedError(Exception):
+    pass
+
+
+class LlmScheduler:
+    """Per-worker gate in front of the LLM provider.
+
+    At most max_in_flight completions (including the time their stream is
+    being read) run at once. Everything else waits in one priority queue, so
+    live turns overtake reminders and reminders overtake background work.
+    Background work is shed when the queue is already long, and every waiter
+    gives up with LlmOverloadedError when its timeout is spent.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = LLM_MAX_IN_FLIGHT,
+        max_queued_background: int = LLM_MAX_QUEUED_BACKGROUND,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queued_background = max_queued_background
+        self._in_flight = 0
+        self._waiters = []
+        self._seq = itertools.count()
+        self.stats = {
+            name: {"granted": 0, "shed": 0, "queue_s_total": 0.0, "queue_s_max": 0.0}
+            for name in PRIORITY_NAMES.values()
+        }
+
+    def _queued(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    def _account(self, priority: int, queued_s: float):
+        stats = self.stats[PRIORITY_NAMES[priority]]
+        stats["granted"] += 1
+        stats["queue_s_total"] += queued_s
+        stats["queue_s_max"] = max(stats["queue_s_max"], queued_s)
+
+    def _shed(self, priority: int, reason: str):
+        self.stats[PRIORITY_NAMES[priority]]["shed"] += 1
+        raise LlmOverloadedError(f"LLM {PRIORITY_NAMES[priority]} request shed: {reason}")
+
+    async def acquire(self, priority: int, timeout: Optional[float] = None) -> float:
+        """Wait for a slot and return the time spent queued."""
+        if self._in_flight < self.max_in_flight and not self._queued():
+            self._in_flight += 1
+            self._account(priority, 0.0)
+            return 0.0
+
+        if priority == PRIORITY_BACKGROUND and self._queued() >= self.max_queued_background:
+            self._shed(priority, f"{self._queued()} requests already queued")
+
+        started = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        try:
+            await asyncio.wait_for(future, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we gave up; pass it on.
+                self.release()
+            if isinstance(e, asyncio.TimeoutError):
+                self._shed(priority, f"no slot within {timeout:.2f}s")
+            raise
+        queued_s = time.monotonic() - started
+        self._account(priority, queued_s)
+        return queued_s
+
+    def release(self):
+        self._in_flight -= 1
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self._in_flight += 1
+                future.set_result(None)
+                break
+
+    @asynccontextmanager
+    async def slot(self, priority: int, timeout: Optional[float] = None):
+        queued_s = await self.acquire(priority, timeout)
+        try:
+            yield queued_s
+        finally:
+            self.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "in_flight": self._in_flight,
+            "queued": self._queued(),
+            "max_in_flight": self.max_in_flight,
+            "priorities": self.stats,
+        }
+
+
+_scheduler: Optional[LlmScheduler] = None
+
+
+def get_llm_scheduler() -> LlmScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LlmScheduler(
+            max_in_flight=int(os.environ.get("LLM_MAX_IN_FLIGHT", LLM_MAX_IN_FLIGHT)),
+            max_queued_background=int(
+                os.environ.get("LLM_MAX_QUEUED_BACKGROUND", LLM_MAX_QUEUED_BACKGROUND)
+            ),
+        )
+    return _scheduler
@@ -1,24 +1,71 @@
 import asyncio
+import hashlib
 import json
 import os
 import re
+import time
 import pytz
 from datetime import datetime
 from typing import List, Optional
 
+import httpx
 import requests
-from openai import AsyncOpenAI
+from openai import APIError, AsyncOpenAI
 
+from .cal_client import CAL_API_BASE, CalQueueFullError, get_cal_scheduler
 from .custom_types import (
     ResponseRequiredRequest,
     ResponseResponse,
     Utterance,
 )
+from .deadline import TurnDeadline
+from .llm_scheduler import (
+    PRIORITY_LIVE,
+    PRIORITY_REMINDER,
+    LlmOverloadedError,
+    get_llm_scheduler,
+)
+from .response_cache import get_response_cache, normalize_utterance, touches_booking
 
 begin_sentence = (
     "Hallo, ich bin Kim, die KI Assistentin von KI Empfang. Kann ich Ihnen mit einer Terminbuchung für eine Demo oder anderweitig weiterhelfen?"
 )
 
+# Spoken when the turn deadline runs out; same wording the prompt prescribes
+# for API failures.
+fallback_sentence = (
+    "Es tut mir leid, ich habe gerade technische Probleme. Ein Kollege wird Sie zurückrufen."
+)
+
+# Spoken when a booking, reschedule or cancellation timed out: the request may
+# still have reached Cal.com, so neither success nor failure can be promised.
+write_unknown_sentence = (
+    "Ich konnte das gerade nicht bestätigen. Ein Kollege prüft es und meldet sich bei Ihnen."
+)
+
+# Default upper bound on tool rounds per turn. Tools are only offered while
+# more than the answer reserve of the turn deadline is left; the final
+# completion is always tool-free.
+MAX_TOOL_ROUNDS = 3
+ANSWER_RESERVE_S = 3.0
+
+# Once a round has started streaming, reads are bounded by this gap between
+# chunks instead of the turn deadline, so an answer is not cut off mid-sentence.
+LLM_STREAM_IDLE_S = 5.0
+
+# Cap for a single Cal.com request; the remaining turn budget may lower it.
+CAL_TIMEOUT_S = 20.0
+# Below this, a Cal.com request is not worth starting.
+MIN_CAL_TIMEOUT_S = 0.5
+
+# Tools that change bookings at Cal.com. Once sent, their outcome is unknown
+# until Cal.com answers, so a timeout must not be reported as a failure.
+WRITE_TOOLS = {"book_appointment_cal", "reschedule_appointment_cal", "cancel_appointment_cal"}
+
+# Idle upstream connections are kept this long (httpx defaults to 5s); the
+# warm-up keep-alive loop pings more often than that.
+LLM_KEEPALIVE_EXPIRY_S = 120.0
+
 agent_prompt = """
 # IDENTITÄT
 Sie sind Kim, die KI-Empfangsdame für "KI-Empfang".
@@ -94,6 +141,134 @@ Agent (Sprache): "Auf Wiedersehen!" (und Call endet)
 """
 
 
+# Tool schemas are static; build them once at import instead of per turn.
+TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "check_availability_cal",
+            "description": "Prüfe freie Slots in Cal.com. EXAMPLE ARGUMENTS: {'eventTypeId': 123, 'start': '2025-10-12T07:00:00Z', 'end': '2025-10-15T16:00:00Z'}",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "eventTypeId": {"type": "integer"},
+                    "start": {
+                        "type": "string",
+                        "description": "ISO-8601 Start (UTC Z)",
+                    },
+                    "end": {
+                        "type": "string",
+                        "description": "ISO-8601 Ende (UTC Z)",
+                    },
+                },
+                "required": ["eventTypeId", "start", "end"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "book_appointment_cal",
+            "description": "Buche einen festen Termin. BEISPIEL ARGUMENTE: {'eventTypeId': 123, 'start': '2025-10-12T07:00:00Z', 'attendee_name': 'Max Mustermann'}",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "eventTypeId": {"type": "integer"},
+                    "start": {
+                        "type": "string",
+                        "description": "Startzeit ISO-8601 UTC (z.B. 2025-10-12T07:00:00Z)",
+                    },
+                    "attendee_name": {
+                        "type": "string",
+                        "description": "Gesprochener Name des Nutzers",
+                    },
+                },
+                "required": ["eventTypeId", "start", "attendee_name"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "reschedule_appointment_cal",
+            "description": "Verschiebe einen Termin anhand bookingUid.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "bookingUid": {"type": "string"},
+                    "start": {
+                        "type": "string",
+                        "description": "Neue Startzeit ISO-8601 UTC (z.B. 2025-10-12T07:00:00Z)",
+                    },
+                    "reschedulingReason": {
+                        "type": "string",
+                        "default": "Reschedule",
+                    },
+                },
+                "required": ["bookingUid", "start"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "cancel_appointment_cal",
+            "description": "Storniere einen Termin anhand bookingUid.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "bookingUid": {"type": "string"},
+                    "cancellationReason": {
+                        "type": "string",
+                        "default": "Stornierung",
+                    },
+                },
+                "required": ["bookingUid"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_bookings_by_time_range",
+            "description": "Hole Buchungen in einem Zeitfenster (zum lokalen Filtern nach Name/Telefon).",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "afterStart": {"type": "string"},
+                    "beforeEnd": {"type": "string"},
+                    "status": {
+                        "type": "string",
+                        "enum": ["accepted", "upcoming", "cancelled"],
+                        "default": "accepted",
+                    },
+                    "eventTypeId": {"type": "integer"},
+                },
+                "required": ["afterStart", "beforeEnd"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "end_call",
+            "description": "Beende den Anruf. Rufen Sie dies auf, wenn der Nutzer keine weiteren Fragen hat oder sich verabschiedet.",
+            "parameters": {
+                "type": "object",
+                "properties": {},
+                "required": [],
+            },
+        },
+    },
+]
+
+
+# Changes to the prompt or the tools invalidate cached answers.
+PROMPT_FINGERPRINT = hashlib.sha1(
+    (agent_prompt + json.dumps(TOOLS, sort_keys=True)).encode()
+).hexdigest()[:12]
+
+
 def _normalize_phone(phone: Optional[str]) -> Optional[str]:
     if not phone:
         return None
@@ -115,40 +290,92 @@ def _normalize_phone(phone: Optional[str]) -> Optional[str]:
     return clean
 
 
+_llm_client = None
+
+
+def get_llm_client():
+    """Return the worker-wide (client, model, using_groq) triple.
+
+    One AsyncOpenAI client is shared by all calls so its connection pool
+    (and the TLS sessions to the provider) survive between calls.
+    """
+    global _llm_client
+    if _llm_client is not None:
+        return _llm_client
+
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=1000,
+            max_keepalive_connections=100,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY_S,
+        ),
+        timeout=httpx.Timeout(600.0, connect=5.0),
+    )
+    groq_key = os.environ.get("GROQ_API_KEY")
+    if groq_key:
+        client = AsyncOpenAI(
+            base_url="https://api.groq.com/openai/v1",
+            api_key=groq_key,
+            http_client=http_client,
+        )
+        model = "moonshotai/kimi-k2-instruct-0905"
+        using_groq = True
+        print("[DEBUG] Using Groq direct endpoint for function calling")
+    else:
+        client = AsyncOpenAI(
+            base_url="https://openrouter.ai/api/v1",
+            api_key=os.environ["OPENROUTER_API_KEY"],
+            default_headers={
+                "HTTP-Referer": "https://github.com/RetellAI/retell-custom-llm-python-demo",
+                "X-Title": "Retell Custom LLM Demo",
+            },
+            http_client=http_client,
+        )
+        model = "moonshotai/kimi-k2-instruct-0905"
+        using_groq = False
+        print("[DEBUG] Using OpenRouter (fallback) for function calling")
+
+    _llm_client = (client, model, using_groq)
+    return _llm_client
+
+
 class LlmClient:
     def __init__(self):
-        groq_key = os.environ.get("GROQ_API_KEY")
-        if groq_key:
-            self.client = AsyncOpenAI(
-                base_url="https://api.groq.com/openai/v1",
-                api_key=groq_key,
-            )
-            self.model = "moonshotai/kimi-k2-instruct-0905"
-            self.using_groq = True
-            print("[DEBUG] Using Groq direct endpoint for function calling")
-        else:
-            self.client = AsyncOpenAI(
-                base_url="https://openrouter.ai/api/v1",
-                api_key=os.environ["OPENROUTER_API_KEY"],
-                default_headers={
-                    "HTTP-Referer": "https://github.com/RetellAI/retell-custom-llm-python-demo",
-                    "X-Title": "Retell Custom LLM Demo",
-                },
-            )
-            self.model = "moonshotai/kimi-k2-instruct-0905"
-            self.using_groq = False
-            print("[DEBUG] Using OpenRouter (fallback) for function calling")
+        self.client, self.model, self.using_groq = get_llm_client()
+        self.llm_scheduler = get_llm_scheduler()
 
         self.cal_api_key = os.environ.get("CAL_API_KEY", "")
         if not self.cal_api_key:
             print("[WARN] CAL_API_KEY not set; Cal.com calls will fail")
 
+        # Overridable so the client can be pointed at a local mock server.
+        self.cal_api_base = os.environ.get("CAL_API_BASE", CAL_API_BASE).rstrip("/")
+        self.cal = get_cal_scheduler()
+
         self.cal_event_type_id = os.environ.get("CAL_EVENT_TYPE_ID", "")
         if not self.cal_event_type_id:
             print("[WARN] CAL_EVENT_TYPE_ID not set; Booking calls will fail")
 
         self.user_phone = "Nicht verfügbar"
 
+        self.max_tool_rounds = int(os.environ.get("MAX_TOOL_ROUNDS", MAX_TOOL_ROUNDS))
+        self.answer_reserve_s = float(os.environ.get("ANSWER_RESERVE_S", ANSWER_RESERVE_S))
+
+        self.response_cache = get_response_cache()
+        # Set once any Cal.com tool ran in this call or the caller mentioned
+        # booking details; from then on answers depend on booking state and
+        # are never served from the cache.
+        self.booking_state = False
+
+        # Set by server.py when CALL_RECORD_DIR is configured.
+        self.recorder = None
+
+        self.turn_count = 0
+        self.call_started_at = time.monotonic()
+        # Last successful availability lookup: (start, end, result). Served
+        # when the turn budget does not allow a fresh Cal.com request.
+        self._last_availability = None
+
     def draft_begin_message(self):
         response = ResponseResponse(
             response_id=0,
@@ -167,9 +394,12 @@ class LlmClient:
                 messages.append({"role": "user", "content": utterance.content})
         return messages
 
+    def _now(self, tz):
+        return datetime.now(tz)
+
     def prepare_prompt(self, request: ResponseRequiredRequest):
         tz = pytz.timezone("Europe/Berlin")
-        current_time_str = datetime.now(tz).strftime("%A, %d. %B %Y, %H:%M Uhr")
+        current_time_str = self._now(tz).strftime("%A, %d. %B %Y, %H:%M Uhr")
         system_content = agent_prompt.replace("{{current_time_Europe/Berlin}}", current_time_str)
         
         # Inject phone status
@@ -205,152 +435,38 @@ class LlmClient:
         return prompt
 
     def prepare_functions(self):
-        return [
-            {
-                "type": "function",
-                "function": {
-                    "name": "check_availability_cal",
-                    "description": "Prüfe freie Slots in Cal.com. EXAMPLE ARGUMENTS: {'eventTypeId': 123, 'start': '2025-10-12T07:00:00Z', 'end': '2025-10-15T16:00:00Z'}",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "eventTypeId": {"type": "integer"},
-                            "start": {
-                                "type": "string",
-                                "description": "ISO-8601 Start (UTC Z)",
-                            },
-                            "end": {
-                                "type": "string",
-                                "description": "ISO-8601 Ende (UTC Z)",
-                            },
-                        },
-                        "required": ["eventTypeId", "start", "end"],
-                    },
-                },
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "book_appointment_cal",
-                    "description": "Buche einen festen Termin. BEISPIEL ARGUMENTE: {'eventTypeId': 123, 'start': '2025-10-12T07:00:00Z', 'attendee_name': 'Max Mustermann'}",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "eventTypeId": {"type": "integer"},
-                            "start": {
-                                "type": "string",
-                                "description": "Startzeit ISO-8601 UTC (z.B. 2025-10-12T07:00:00Z)",
-                            },
-                            "attendee_name": {
-                                "type": "string",
-                                "description": "Gesprochener Name des Nutzers",
-                            },
-                        },
-                        "required": ["eventTypeId", "start", "attendee_name"],
-                    },
-                },
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "reschedule_appointment_cal",
-                    "description": "Verschiebe einen Termin anhand bookingUid.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "bookingUid": {"type": "string"},
-                            "start": {
-                                "type": "string",
-                                "description": "Neue Startzeit ISO-8601 UTC (z.B. 2025-10-12T07:00:00Z)",
-                            },
-                            "reschedulingReason": {
-                                "type": "string",
-                                "default": "Reschedule",
-                            },
-                        },
-                        "required": ["bookingUid", "start"],
-                    },
-                },
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "cancel_appointment_cal",
-                    "description": "Storniere einen Termin anhand bookingUid.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "bookingUid": {"type": "string"},
-                            "cancellationReason": {
-                                "type": "string",
-                                "default": "Stornierung",
-                            },
-                        },
-                        "required": ["bookingUid"],
-                    },
-                },
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_bookings_by_time_range",
-                    "description": "Hole Buchungen in einem Zeitfenster (zum lokalen Filtern nach Name/Telefon).",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "afterStart": {"type": "string"},
-                            "beforeEnd": {"type": "string"},
-                            "status": {
-                                "type": "string",
-                                "enum": ["accepted", "upcoming", "cancelled"],
-                                "default": "accepted",
-                            },
-                            "eventTypeId": {"type": "integer"},
-                        },
-                        "required": ["afterStart", "beforeEnd"],
-                    },
-                },
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "end_call",
-                    "description": "Beende den Anruf. Rufen Sie dies auf, wenn der Nutzer keine weiteren Fragen hat oder sich verabschiedet.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {},
-                        "required": [],
-                    },
-                },
-            },
-        ]
+        return TOOLS
 
     # ---- Cal.com HTTP helpers -------------------------------------------------
+    def _cal_expires_at(self, expires_at: Optional[float]) -> float:
+        # Callers outside a turn get the plain per-request cap.
+        return expires_at if expires_at is not None else time.monotonic() + CAL_TIMEOUT_S
+
     def _headers(self):
         return {
             "Authorization": f"Bearer {self.cal_api_key}",
             "cal-api-version": "2024-08-13",
         }
 
-    def _check_availability(self, event_type_id: int, start: str, end: str):
-        url = "https://api.cal.com/v2/slots"
+    def _check_availability(self, event_type_id: int, start: str, end: str, expires_at: Optional[float] = None):
+        url = f"{self.cal_api_base}/slots"
         params = {
             "eventTypeId": event_type_id,
             "start": start,
             "end": end,
             "timeZone": "Europe/Berlin",
         }
-        r = requests.get(
+        r = self.cal.get(
             url,
             params=params,
             headers=self._headers(),
-            timeout=20,
+            expires_at=self._cal_expires_at(expires_at),
         )
         print(f"[DEBUG] Cal API Status: {r.status_code}, Response: {r.text}")
         r.raise_for_status()
         return r.json()
 
-    def _book(self, event_type_id: int, start: str, attendee: dict):
+    def _book(self, event_type_id: int, start: str, attendee: dict, expires_at: Optional[float] = None):
         # Force UTC conversion if offset is present
         if "+" in start and not start.endswith("Z"):
             try:
@@ -360,7 +476,7 @@ class LlmClient:
             except ValueError:
                 pass
 
-        url = "https://api.cal.com/v2/bookings"
+        url = f"{self.cal_api_base}/bookings"
         # Extract phone from attendee, or fallback to system captured phone
         phone = attendee.get("phoneNumber")
         if not phone and self.user_phone and self.user_phone != "Nicht verfügbar":
@@ -379,12 +495,12 @@ class LlmClient:
             "attendee": attendee,
             "metadata": {"phone": norm_phone},
         }
-        r = requests.post(url, json=payload, headers=self._headers(), timeout=20)
+        r = self.cal.post(url, json=payload, headers=self._headers(), expires_at=self._cal_expires_at(expires_at))
         print(f"[DEBUG] Cal Book API Status: {r.status_code}, Response: {r.text}")
         r.raise_for_status()
         return r.json()
 
-    def _reschedule(self, booking_uid: str, start: str, reason: str = "Reschedule"):
+    def _reschedule(self, booking_uid: str, start: str, reason: str = "Reschedule", expires_at: Optional[float] = None):
         # Force UTC conversion if offset is present
         if "+" in start and not start.endswith("Z"):
             try:
@@ -394,23 +510,23 @@ class LlmClient:
             except ValueError:
                 pass
         
-        url = f"https://api.cal.com/v2/bookings/{booking_uid}/reschedule"
+        url = f"{self.cal_api_base}/bookings/{booking_uid}/reschedule"
         payload = {"start": start, "reschedulingReason": reason}
-        r = requests.post(url, json=payload, headers=self._headers(), timeout=20)
+        r = self.cal.post(url, json=payload, headers=self._headers(), expires_at=self._cal_expires_at(expires_at))
         print(f"[DEBUG] Cal Reschedule API Status: {r.status_code}, Response: {r.text}")
         r.raise_for_status()
         return r.json()
 
-    def _cancel(self, booking_uid: str, reason: str = "Stornierung"):
-        url = f"https://api.cal.com/v2/bookings/{booking_uid}/cancel"
+    def _cancel(self, booking_uid: str, reason: str = "Stornierung", expires_at: Optional[float] = None):
+        url = f"{self.cal_api_base}/bookings/{booking_uid}/cancel"
         payload = {"cancellationReason": reason}
-        r = requests.post(url, json=payload, headers=self._headers(), timeout=20)
+        r = self.cal.post(url, json=payload, headers=self._headers(), expires_at=self._cal_expires_at(expires_at))
         print(f"[DEBUG] Cal Cancel API Status: {r.status_code}, Response: {r.text}")
         r.raise_for_status()
         return r.json()
 
-    def _get_bookings(self, after_start: str, before_end: str, status: str, event_type_id: Optional[int]):
-        url = "https://api.cal.com/v2/bookings"
+    def _get_bookings(self, after_start: str, before_end: str, status: str, event_type_id: Optional[int], expires_at: Optional[float] = None):
+        url = f"{self.cal_api_base}/bookings"
         params = {
             "afterStart": after_start,
             "beforeEnd": before_end,
@@ -418,136 +534,453 @@ class LlmClient:
         }
         if event_type_id:
             params["eventTypeId"] = event_type_id
-        r = requests.get(url, params=params, headers=self._headers(), timeout=20)
+        r = self.cal.get(url, params=params, headers=self._headers(), expires_at=self._cal_expires_at(expires_at))
         print(f"[DEBUG] Cal Get Bookings API Status: {r.status_code}, Response: {r.text}")
         r.raise_for_status()
         return r.json()
 
+    # ---- Tool execution ---------------------------------------------------------
+    def _cached_availability_content(self):
+        if not self._last_availability:
+            return None
+        start, end, result = self._last_availability
+        return f"API Result (cached, window {start} - {end}): {json.dumps(result)}"
+
+    def _degraded_tool_content(self, func_name: str):
+        if func_name == "check_availability_cal":
+            cached = self._cached_availability_content()
+            if cached:
+                return cached
+        return f"API Error: Cal.com is temporarily unavailable. Tell the user: {fallback_sentence}"
+
+    def _write_unknown_content(self, func_name: str):
+        return (
+            f"UNKNOWN: Cal.com did not confirm {func_name} in time; it may or may not have "
+            f"gone through. Do NOT call {func_name} again in this call. "
+            f"Tell the user: {write_unknown_sentence}"
+        )
+
+    def _log_late_cal_result(self, func_name: str, task: asyncio.Future):
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error:
+            print(f"[WARN] {func_name} finished after its timeout with an error: {error}")
+        else:
+            print(f"[WARN] {func_name} finished after its timeout: {json.dumps(task.result())}")
+
+    async def _execute_tool(self, func_name: str, arguments: str, deadline: TurnDeadline):
+        """Run one tool call and return (content for the LLM, end_call flag)."""
+        try:
+            args = json.loads(arguments or "{}")
+        except json.JSONDecodeError:
+            print(f"[ERROR] Invalid tool arguments for {func_name}: {arguments}")
+            return "Error: Invalid tool arguments.", False
+
+        print(f"[DEBUG] Executing tool: {func_name} with args: {args}")
+        if func_name != "end_call":
+            self.booking_state = True
+
+        # Cal.com gets what is left of the turn minus the time reserved for
+        # speaking the answer.
+        timeout = deadline.timeout(cap=CAL_TIMEOUT_S, reserve=self.answer_reserve_s)
+        if func_name != "end_call" and timeout < MIN_CAL_TIMEOUT_S:
+            deadline.degrade(f"no budget left for {func_name}")
+            content = self._degraded_tool_content(func_name)
+            if self.recorder:
+                self.recorder.tool(func_name, args, None, content, 0.0, None, skipped=True)
+            return content, False
+
+        # Fixed here, on the event loop, so that time spent waiting for a
+        # worker thread counts against the budget as well.
+        expires_at = time.monotonic() + timeout
+
+        async def call_cal(helper, *helper_args):
+            task = asyncio.ensure_future(asyncio.to_thread(helper, *helper_args, expires_at))
+            try:
+                return await asyncio.wait_for(
+                    asyncio.shield(task),
+                    timeout=max(0.0, expires_at - time.monotonic()),
+                )
+            finally:
+                if not task.done():
+                    # The worker thread cannot be stopped, and a write may
+                    # still land at Cal.com; log how it ends.
+                    task.add_done_callback(
+                        lambda t: self._log_late_cal_result(func_name, t)
+                    )
+
+        content = ""
+        should_end_call = False
+        result = None
+        error = None
+        started = time.monotonic()
+        # Execute Python Logic
+        try:
+            if func_name == "check_availability_cal":
+                result = await call_cal(
+                    self._check_availability,
+                    args["eventTypeId"], args["start"], args["end"]
+                )
+                self._last_availability = (args["start"], args["end"], result)
+                content = f"API Result: {json.dumps(result)}"
+
+            elif func_name == "book_appointment_cal":
+                # Construct attendee object from flat args
+                attendee = {
+                    "name": args["attendee_name"],
+                    "email": "anfrage@kiempfang.de",
+                    "timeZone": "Europe/Berlin",
+                    "language": "de"
+                }
+
+                if self.user_phone and self.user_phone != "Nicht verfügbar":
+                    attendee["phoneNumber"] = self.user_phone
+
+                result = await call_cal(
+                    self._book,
+                    args["eventTypeId"], args["start"], attendee
+                )
+                content = "SUCCESS: Appointment booked. Confirm this to user."
+                self._record_booking()
+
+            elif func_name == "reschedule_appointment_cal":
+                result = await call_cal(
+                    self._reschedule,
+                    args["bookingUid"], args["start"], args.get("reschedulingReason", "Reschedule")
+                )
+                content = f"SUCCESS: Rescheduled. Result: {json.dumps(result)}"
+
+            elif func_name == "cancel_appointment_cal":
+                result = await call_cal(
+                    self._cancel,
+                    args["bookingUid"], args.get("cancellationReason", "Stornierung")
+                )
+                content = "SUCCESS: Appointment cancelled."
+
+            elif func_name == "get_bookings_by_time_range":
+                result = await call_cal(
+                    self._get_bookings,
+                    args["afterStart"], args["beforeEnd"], args.get("status", "accepted"), args.get("eventTypeId")
+                )
+                content = f"API Result: {json.dumps(result)}"
+
+            elif func_name == "end_call":
+                should_end_call = True
+                content = "Call will be ended after response."
+
+            else:
+                content = "Error: Tool not found."
+
+        except (requests.Timeout, asyncio.TimeoutError) as e:
+            error = e
+            deadline.degrade(f"{func_name} timed out after {timeout:.1f}s")
+            if func_name in WRITE_TOOLS:
+                content = self._write_unknown_content(func_name)
+            else:
+                content = self._degraded_tool_content(func_name)
+        except CalQueueFullError as e:
+            error = e
+            deadline.degrade(f"{func_name} rejected: {e}")
+            content = self._degraded_tool_content(func_name)
+        except requests.HTTPError as e:
+            error = e
+            status = e.response.status_code if e.response is not None else None
+            if status == 429 or (status is not None and status >= 500):
+                # The scheduler already retried; these are not the model's
+                # fault and their text must not reach the caller.
+                deadline.degrade(f"{func_name} failed with HTTP {status} after retries")
+                if func_name in WRITE_TOOLS and status != 429:
+                    # Unlike a 429, a 5xx does not say the write was not applied.
+                    content = self._write_unknown_content(func_name)
+                else:
+                    content = self._degraded_tool_content(func_name)
+            else:
+                print(f"[ERROR] Tool execution failed: {e}")
+                content = f"API Error: {str(e)}"
+        except Exception as e:
+            error = e
+            print(f"[ERROR] Tool execution failed: {e}")
+            content = f"API Error: {str(e)}"
+
+        if self.recorder:
+            self.recorder.tool(
+                func_name, args, result, content, time.monotonic() - started, error
+            )
+        return content, should_end_call
+
+    def _record_booking(self):
+        # Turns-per-booking and booking completion time, measured from call start.
+        elapsed = time.monotonic() - self.call_started_at
+        print(
+            f"[METRIC] booking_completed turns={self.turn_count} "
+            f"elapsed_s={elapsed:.1f}"
+        )
+
+    # ---- Response cache -------------------------------------------------------
+    def _response_cache_key(self, request: ResponseRequiredRequest):
+        """Key for a cacheable FAQ turn, or None when the cache must be bypassed."""
+        if request.interaction_type != "response_required":
+            return None
+        if not request.transcript or request.transcript[-1].role != "user":
+            return None
+        # Once the caller has mentioned a date, a time or a booking anywhere
+        # in the call, later answers depend on it ("Ja, gerne." after giving
+        # a time), so the rest of the call bypasses the cache.
+        if not self.booking_state and any(
+            u.role == "user" and touches_booking(normalize_utterance(u.content))
+            for u in request.transcript
+        ):
+            self.booking_state = True
+        if self.booking_state:
+            return None
+        utterance = normalize_utterance(request.transcript[-1].content)
+        if not utterance:
+            return None
+        previous = next(
+            (u.content for u in reversed(request.transcript[:-1]) if u.role == "agent"),
+            "",
+        )
+        # A reply to a booking question is about booking too. The greeting
+        # mentions bookings but asks nothing specific, so it does not count.
+        if previous != begin_sentence and touches_booking(normalize_utterance(previous)):
+            return None
+        fingerprint = hashlib.sha1(
+            f"{self.model}|{PROMPT_FINGERPRINT}|{normalize_utterance(previous)}".encode()
+        ).hexdigest()[:16]
+        return (utterance, fingerprint)
+
     # ---- Draft response with function calling ---------------------------------
-    async def draft_response(self, request: ResponseRequiredRequest):
+    async def draft_response(self, request: ResponseRequiredRequest, deadline: Optional[TurnDeadline] = None):
+        if deadline is None:
+            deadline = TurnDeadline()
+
         # 1. Update dynamic context from the request (pseudo-code, depends on provider)
         # Note: server.py handles injecting user_phone into self.user_phone before calling draft_response.
         # We also re-normalize here if we wanted to be sure, but server.py logic does simple assignment.
         if self.user_phone and self.user_phone != "Nicht verfügbar":
             self.user_phone = _normalize_phone(self.user_phone) or "Nicht verfügbar"
 
-        # 2. Prepare initial messages
+        self.turn_count += 1
+
+        # 2. Answer recurring questions from the cache without an LLM call
+        cache_key = None
+        if self.response_cache:
+            cache_key = self._response_cache_key(request)
+            if cache_key is None:
+                self.response_cache.bypass()
+            else:
+                cached = self.response_cache.get(cache_key)
+                if cached is not None:
+                    print(
+                        f"[METRIC] turn response_id={request.response_id} rounds=0 "
+                        f"response_cache=hit elapsed_s={deadline.elapsed():.2f}"
+                    )
+                    deadline.log(request.response_id)
+                    yield ResponseResponse(
+                        response_id=request.response_id,
+                        content=cached,
+                        content_complete=True,
+                        end_call=False,
+                    )
+                    return
+
+        # 3. Prepare initial messages
         messages = self.prepare_prompt(request)
-        
-        # 3. First LLM Call (Determine Intent)
-        completion = await self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            tools=self.prepare_functions(),
-            stream=False # We use non-stream first to catch tool calls cleanly
-        )
-        
-        message = completion.choices[0].message
-        
-        should_end_call = False
+        tools = self.prepare_functions()
 
-        # 4. Check for Tool Calls
-        if message.tool_calls:
-            # A. Append the assistant's "intent" to call a tool to history
-            messages.append(message)
-            
-            # B. Execute Tools
-            for tool_call in message.tool_calls:
-                # Parse args
-                args = json.loads(tool_call.function.arguments)
-                func_name = tool_call.function.name
-                
-                print(f"[DEBUG] Executing tool: {func_name} with args: {args}")
-
-                content = ""
-                # Execute Python Logic
-                try:
-                    if func_name == "check_availability_cal":
-                        result = await asyncio.to_thread(
-                            self._check_availability,
-                            args["eventTypeId"], args["start"], args["end"]
-                        )
-                        content = f"API Result: {json.dumps(result)}"
-                        
-                    elif func_name == "book_appointment_cal":
-                        # Construct attendee object from flat args
-                        attendee = {
-                            "name": args["attendee_name"],
-                            "email": "anfrage@kiempfang.de",
-                            "timeZone": "Europe/Berlin",
-                            "language": "de"
-                        }
-                        
-                        if self.user_phone and self.user_phone != "Nicht verfügbar":
-                            attendee["phoneNumber"] = self.user_phone
-                        
-                        result = await asyncio.to_thread(
-                            self._book,
-                            args["eventTypeId"], args["start"], attendee
-                        )
-                        content = "SUCCESS: Appointment booked. Confirm this to user."
-                    
-                    elif func_name == "reschedule_appointment_cal":
-                        result = await asyncio.to_thread(
-                            self._reschedule,
-                            args["bookingUid"], args["start"], args.get("reschedulingReason", "Reschedule")
-                        )
-                        content = f"SUCCESS: Rescheduled. Result: {json.dumps(result)}"
-
-                    elif func_name == "cancel_appointment_cal":
-                        await asyncio.to_thread(
-                            self._cancel,
-                            args["bookingUid"], args.get("cancellationReason", "Stornierung")
-                        )
-                        content = "SUCCESS: Appointment cancelled."
-
-                    elif func_name == "get_bookings_by_time_range":
-                        result = await asyncio.to_thread(
-                            self._get_bookings,
-                            args["afterStart"], args["beforeEnd"], args.get("status", "accepted"), args.get("eventTypeId")
-                        )
-                        content = f"API Result: {json.dumps(result)}"
-
-                    elif func_name == "end_call":
-                         should_end_call = True
-                         content = "Call will be ended after response."
-
-                    else:
-                        content = "Error: Tool not found."
-                        
-                except Exception as e:
-                    print(f"[ERROR] Tool execution failed: {e}")
-                    content = f"API Error: {str(e)}"
-
-                # C. Append Tool Result to history
-                messages.append({
-                    "role": "tool",
-                    "tool_call_id": tool_call.id,
-                    "content": content
-                })
+        should_end_call = False
+        rounds = 0
+        queued_s = 0.0
+        # Whether any text of this turn has been streamed to the caller yet.
+        spoken = False
+        priority = (
+            PRIORITY_REMINDER
+            if request.interaction_type == "reminder_required"
+            else PRIORITY_LIVE
+        )
 
-            # 5. Second LLM Call (Generate Natural Language from Result)
-            # Now we stream the speech
-            stream = await self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                stream=True
+        # 4. Tool loop: the model may chain tools (e.g. check availability,
+        # then book) within one response_id. The last round, or any round
+        # once the deadline is down to the answer reserve, is sent without
+        # tools so the model has to answer in plain speech.
+        while True:
+            rounds += 1
+            if deadline.expired():
+                deadline.degrade("turn deadline reached before LLM call")
+                yield ResponseResponse(
+                    response_id=request.response_id,
+                    content=(" " if spoken else "") + fallback_sentence,
+                    content_complete=False,
+                    end_call=should_end_call,
+                )
+                break
+
+            # Once end_call ran, only the goodbye is left to say.
+            offer_tools = (
+                rounds <= self.max_tool_rounds
+                and deadline.remaining() > self.answer_reserve_s
+                and not should_end_call
             )
-            
-            async for chunk in stream:
-                if chunk.choices[0].delta.content:
+            kwargs = {"tools": tools} if offer_tools else {}
+
+            text = ""
+            tool_calls = {}
+            try:
+                # The slot is held while the stream is read and released
+                # before tools run.
+                async with self.llm_scheduler.slot(
+                    priority, timeout=deadline.remaining()
+                ) as slot_queued_s:
+                    queued_s += slot_queued_s
+                    stream = await asyncio.wait_for(
+                        self.client.chat.completions.create(
+                            model=self.model,
+                            messages=messages,
+                            stream=True,
+                            **kwargs,
+                        ),
+                        timeout=deadline.remaining(),
+                    )
+                    # Close the response however the round ends (timeout,
+                    # API error, or the turn being superseded) so the
+                    # provider stops generating and the connection goes back
+                    # to the pool before the slot is released.
+                    try:
+                        chunks = stream.__aiter__()
+                        first_token = False
+                        while True:
+                            # The deadline only bounds the wait for the first
+                            # token; after that the gap between chunks is bounded.
+                            # Reads are timed individually so the yields below
+                            # are not inside a timeout scope.
+                            read_timeout = (
+                                LLM_STREAM_IDLE_S if first_token else deadline.remaining()
+                            )
+                            try:
+                                chunk = await asyncio.wait_for(
+                                    chunks.__anext__(), timeout=read_timeout
+                                )
+                            except StopAsyncIteration:
+                                break
+                            if not chunk.choices:
+                                continue
+                            delta = chunk.choices[0].delta
+                            if delta.content or delta.tool_calls:
+                                first_token = True
+                            if delta.content:
+                                # Stream interim text right away, even in a tool
+                                # round; separate it from text of earlier rounds.
+                                content = delta.content
+                                if spoken and not text:
+                                    content = " " + content
+                                text += delta.content
+                                spoken = True
+                                yield ResponseResponse(
+                                    response_id=request.response_id,
+                                    content=content,
+                                    content_complete=False,
+                                    end_call=should_end_call,
+                                )
+                            for tc in delta.tool_calls or []:
+                                entry = tool_calls.setdefault(
+                                    tc.index, {"id": "", "name": "", "arguments": ""}
+                                )
+                                if tc.id:
+                                    entry["id"] = tc.id
+                                if tc.function and tc.function.name:
+                                    entry["name"] += tc.function.name
+                                if tc.function and tc.function.arguments:
+                                    entry["arguments"] += tc.function.arguments
+                    finally:
+                        await stream.close()
+            except (asyncio.TimeoutError, APIError, LlmOverloadedError) as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    deadline.degrade(f"LLM round {rounds} timed out")
+                else:
+                    deadline.degrade(f"LLM round {rounds} failed: {e}")
+                if text and not tool_calls:
+                    # The caller is already hearing this round's answer; end
+                    # it there rather than appending an apology.
+                    break
+                yield ResponseResponse(
+                    response_id=request.response_id,
+                    content=(" " if spoken else "") + fallback_sentence,
+                    content_complete=False,
+                    end_call=should_end_call,
+                )
+                break
+
+            if self.recorder:
+                self.recorder.llm_round(
+                    request.response_id,
+                    rounds,
+                    text,
+                    [tool_calls[i] for i in sorted(tool_calls)],
+                )
+
+            if not tool_calls:
+                break
+            if not offer_tools:
+                # The model asked for tools in a round that did not offer
+                # any. Running them would make max_tool_rounds no limit at
+                # all, so they are dropped and the turn ends here.
+                print(
+                    f"[WARN] Dropping {len(tool_calls)} tool call(s) from round {rounds}, "
+                    f"which was sent without tools"
+                )
+                if not text:
                     yield ResponseResponse(
                         response_id=request.response_id,
-                        content=chunk.choices[0].delta.content,
+                        content=(" " if spoken else "") + fallback_sentence,
                         content_complete=False,
                         end_call=should_end_call,
                     )
-        
-        else:
-            # No tool called, just speak the text
-            yield ResponseResponse(
-                response_id=request.response_id,
-                content=message.content or "",
-                content_complete=True,
-                end_call=False,
-            )
+                break
+
+            # A. Append the assistant's "intent" to call tools to history
+            ordered = [tool_calls[i] for i in sorted(tool_calls)]
+            messages.append({
+                "role": "assistant",
+                "content": text or None,
+                "tool_calls": [
+                    {
+                        "id": tc["id"],
+                        "type": "function",
+                        "function": {"name": tc["name"], "arguments": tc["arguments"]},
+                    }
+                    for tc in ordered
+                ],
+            })
+
+            # B. Execute tools and append their results to history
+            for tc in ordered:
+                content, end_call = await self._execute_tool(tc["name"], tc["arguments"], deadline)
+                should_end_call = should_end_call or end_call
+                messages.append({
+                    "role": "tool",
+                    "tool_call_id": tc["id"],
+                    "content": content
+                })
+
+        # Only plain answers that needed no tool and no fallback are reused.
+        if (
+            cache_key
+            and deadline.degraded_reason is None
+            and rounds == 1
+            and not tool_calls
+            and text
+        ):
+            self.response_cache.put(cache_key, text)
+
+        print(
+            f"[METRIC] turn response_id={request.response_id} rounds={rounds} "
+            f"llm_queue_s={queued_s:.2f} elapsed_s={deadline.elapsed():.2f}"
+        )
+        deadline.log(request.response_id)
+        yield ResponseResponse(
+            response_id=request.response_id,
+            content="",
+            content_complete=True,
+            end_call=should_end_call,
+        )
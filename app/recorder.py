@@ -0,0 +1,86 @@
+import gzip
+import json
+import os
+import time
+from typing import Optional
+
+# Frames needed to replay a call; ping_pong and update_only carry nothing
+# the replayer uses.
+RECORDED_INTERACTIONS = {"call_details", "response_required", "reminder_required"}
+
+
+class CallRecorder:
+    """Writes one call to <directory>/<call_id>.jsonl.gz.
+
+    Each line is a compact JSON record with a "kind": the inbound websocket
+    frames, what the model did in every LLM round, and the raw input/output
+    of every tool call. app.replay reads these files back.
+    """
+
+    def __init__(self, directory: str, call_id: str):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{call_id}.jsonl.gz")
+        self._file = gzip.open(self.path, "wt", encoding="utf-8")
+        self._started = time.monotonic()
+        self._write("call", call_id=call_id, recorded_at=int(time.time()))
+
+    def _write(self, kind: str, **fields):
+        record = {"kind": kind, "t": round(time.monotonic() - self._started, 3), **fields}
+        self._file.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n")
+
+    def frame(self, request_json: dict):
+        if request_json.get("interaction_type") in RECORDED_INTERACTIONS:
+            self._write("frame", data=request_json)
+
+    def llm_round(self, response_id: int, round_no: int, text: str, tool_calls: list):
+        self._write(
+            "llm_round",
+            response_id=response_id,
+            round=round_no,
+            text=text,
+            tool_calls=[{"name": tc["name"], "arguments": tc["arguments"]} for tc in tool_calls],
+        )
+
+    def tool(
+        self,
+        name: str,
+        args: dict,
+        result,
+        content: str,
+        duration_s: float,
+        error: Optional[Exception],
+        skipped: bool = False,
+    ):
+        # skipped marks a call that never reached Cal.com because the turn
+        # had no budget left; the replayer must not hand it a result.
+        self._write(
+            "tool",
+            name=name,
+            args=args,
+            result=result,
+            content=content,
+            duration_s=round(duration_s, 3),
+            error=str(error) if error else None,
+            error_type=type(error).__name__ if error else None,
+            skipped=skipped,
+        )
+
+    def close(self):
+        self._file.close()
+
+
+def open_recorder(call_id: str) -> Optional[CallRecorder]:
+    """Start recording when CALL_RECORD_DIR is set."""
+    directory = os.environ.get("CALL_RECORD_DIR")
+    if not directory:
+        return None
+    try:
+        return CallRecorder(directory, call_id)
+    except OSError as e:
+        print(f"[WARN] Could not record call {call_id}: {e}")
+        return None
+
+
+def load_recording(path: str) -> list:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -0,0 +1,296 @@
+"""Replay recorded calls offline and track tokens and latency against a baseline.
+
+Record calls by running the server with CALL_RECORD_DIR set, then:
+
+    python -m app.replay recordings/*.jsonl.gz --update-baseline
+    python -m app.replay recordings/*.jsonl.gz
+
+bench/recordings/ ships a synthetic sample call with its baseline in
+bench/baseline.json.
+
+Every recorded turn runs through LlmClient.draft_response. A deterministic
+stand-in for the LLM replays the model's recorded text and tool calls, and
+the Cal.com helpers return the recorded results, so differences come only
+from the code: the prompt, the tool schemas and the tool-result format. Token
+counts are estimated from the exact payload that would be sent, and latency
+is simulated from those counts plus the recorded Cal.com durations. The run
+fails when any metric is worse than the baseline by more than the tolerance.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+from datetime import datetime
+from types import SimpleNamespace
+
+import requests
+
+from .custom_types import ResponseRequiredRequest
+from .deadline import TurnDeadline
+from .llm_with_func_calling import LlmClient
+from .recorder import load_recording
+
+BASELINE_PATH = "bench/baseline.json"
+# Replays are deterministic, so by default any increase is a regression.
+TOLERANCE = 0.0
+
+# Simulated provider latency.
+LLM_FIRST_TOKEN_S = 0.30
+LLM_PREFILL_S_PER_1K_TOKENS = 0.04
+LLM_S_PER_OUTPUT_TOKEN = 0.004
+
+# Spoken by the stand-in when the recording has no round to replay (e.g. the
+# turn was served from the response cache while recording).
+DEFAULT_ANSWER = "Gern, wie kann ich Ihnen weiterhelfen?"
+
+# Prompt context pinned so that token counts do not depend on the clock or
+# the local environment.
+REPLAY_NOW = datetime(2025, 1, 6, 10, 0)
+REPLAY_EVENT_TYPE_ID = "123456"
+
+METRICS = (
+    "prompt_tokens",
+    "completion_tokens",
+    "llm_round_trips",
+    "turn_latency_mean_s",
+    "turn_latency_max_s",
+)
+
+HELPER_TOOLS = {
+    "_check_availability": "check_availability_cal",
+    "_book": "book_appointment_cal",
+    "_reschedule": "reschedule_appointment_cal",
+    "_cancel": "cancel_appointment_cal",
+    "_get_bookings": "get_bookings_by_time_range",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token; stable, which is what matters here.
+    return (len(text) + 3) // 4
+
+
+def _chunk(content=None, tool_calls=None):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(delta=SimpleNamespace(content=content, tool_calls=tool_calls))]
+    )
+
+
+class ReplayStream:
+    """Async iterator over canned chunks with the close() of openai's AsyncStream."""
+
+    def __init__(self, chunks: list):
+        self._chunks = iter(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def close(self):
+        pass
+
+
+class ReplayLlm:
+    """Stands in for AsyncOpenAI and replays the recorded LLM rounds."""
+
+    def __init__(self, rounds: dict):
+        self.rounds = rounds
+        self.chat = SimpleNamespace(completions=self)
+        self.response_id = None
+        self.round = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.round_trips = 0
+        self.turn_latency_s = 0.0
+
+    def begin_turn(self, response_id: int):
+        self.response_id = response_id
+        self.round = 0
+        self.turn_latency_s = 0.0
+
+    async def create(self, model, messages, stream=False, tools=None, **kwargs):
+        self.round += 1
+        recorded = self.rounds.get((self.response_id, self.round), {})
+        text = recorded.get("text", "")
+        tool_calls = recorded.get("tool_calls", []) if tools else []
+        if not text and not tool_calls:
+            text = DEFAULT_ANSWER
+
+        prompt_tokens = estimate_tokens(json.dumps(messages, ensure_ascii=False, default=str))
+        if tools:
+            prompt_tokens += estimate_tokens(json.dumps(tools, ensure_ascii=False))
+        completion_tokens = estimate_tokens(text) + sum(
+            estimate_tokens(tc["name"] + tc["arguments"]) for tc in tool_calls
+        )
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.round_trips += 1
+        self.turn_latency_s += (
+            LLM_FIRST_TOKEN_S
+            + prompt_tokens / 1000 * LLM_PREFILL_S_PER_1K_TOKENS
+            + completion_tokens * LLM_S_PER_OUTPUT_TOKEN
+        )
+
+        chunks = []
+        if text:
+            chunks.append(_chunk(content=text))
+        for index, tc in enumerate(tool_calls):
+            chunks.append(_chunk(tool_calls=[SimpleNamespace(
+                index=index,
+                id=f"call_{self.response_id}_{self.round}_{index}",
+                function=SimpleNamespace(name=tc["name"], arguments=tc["arguments"]),
+            )]))
+
+        return ReplayStream(chunks)
+
+
+def _replay_helper(tool_name: str):
+    def helper(self, *args, **kwargs):
+        queue = self.recorded_tools.get(tool_name)
+        if not queue:
+            raise requests.Timeout(f"No recorded result for {tool_name}")
+        entry = queue.pop(0)
+        if entry.get("skipped"):
+            # The recorded turn had no budget for this call; a timeout takes
+            # the same degraded path without shifting later results.
+            raise requests.Timeout(f"{tool_name} was skipped in the recording")
+        self.llm.turn_latency_s += entry.get("duration_s") or 0.0
+        if entry.get("error_type"):
+            if "Timeout" in entry["error_type"]:
+                raise requests.Timeout(entry["error"])
+            raise Exception(entry["error"])
+        return entry.get("result")
+    return helper
+
+
+class ReplayClient(LlmClient):
+    def _now(self, tz):
+        return tz.localize(REPLAY_NOW)
+
+
+for _method, _tool_name in HELPER_TOOLS.items():
+    setattr(ReplayClient, _method, _replay_helper(_tool_name))
+
+
+def _make_replay_client(records: list) -> ReplayClient:
+    client = ReplayClient()
+    client.response_cache = None
+    client.cal_event_type_id = REPLAY_EVENT_TYPE_ID
+    client.llm = ReplayLlm({
+        (r["response_id"], r["round"]): r for r in records if r["kind"] == "llm_round"
+    })
+    client.client = client.llm
+    client.recorded_tools = {}
+    for r in records:
+        if r["kind"] == "tool":
+            client.recorded_tools.setdefault(r["name"], []).append(r)
+    return client
+
+
+async def replay_call(path: str) -> dict:
+    records = load_recording(path)
+    client = _make_replay_client(records)
+    turn_latencies = []
+    for record in records:
+        if record["kind"] != "frame":
+            continue
+        frame = record["data"]
+        if frame["interaction_type"] == "call_details":
+            call_data = frame.get("call", {})
+            phone = call_data.get("from_number") or call_data.get("to_number")
+            if phone:
+                client.user_phone = phone
+            continue
+        request = ResponseRequiredRequest(
+            interaction_type=frame["interaction_type"],
+            response_id=frame["response_id"],
+            transcript=frame["transcript"],
+        )
+        client.llm.begin_turn(request.response_id)
+        async for _ in client.draft_response(request, TurnDeadline(budget_s=3600)):
+            pass
+        turn_latencies.append(client.llm.turn_latency_s)
+
+    return {
+        "turns": len(turn_latencies),
+        "prompt_tokens": client.llm.prompt_tokens,
+        "completion_tokens": client.llm.completion_tokens,
+        "llm_round_trips": client.llm.round_trips,
+        "turn_latency_mean_s": round(sum(turn_latencies) / len(turn_latencies), 3) if turn_latencies else 0.0,
+        "turn_latency_max_s": round(max(turn_latencies), 3) if turn_latencies else 0.0,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for call_id, metrics in results.items():
+        if call_id not in baseline:
+            print(f"[WARN] {call_id} has no baseline entry")
+            continue
+        for name in METRICS:
+            before = baseline[call_id].get(name)
+            after = metrics[name]
+            if before is not None and after > before * (1 + tolerance) + 1e-9:
+                regressions.append(f"{call_id}: {name} {before} -> {after}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recordings", nargs="+", help="*.jsonl.gz files written by the recorder")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="show the client's own log output")
+    args = parser.parse_args(argv)
+
+    # The stand-ins never reach a provider, but LlmClient wants a key.
+    os.environ.setdefault("OPENROUTER_API_KEY", "replay")
+
+    results = {}
+    for path in sorted(args.recordings):
+        call_id = os.path.basename(path).removesuffix(".jsonl.gz")
+        log = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with log:
+            results[call_id] = asyncio.run(replay_call(path))
+
+    print(f"\n{'call_id':<36} {'turns':>5} {'prompt':>8} {'compl':>7} {'rounds':>6} {'mean_s':>7} {'max_s':>7}")
+    for call_id, m in results.items():
+        print(
+            f"{call_id:<36} {m['turns']:>5} {m['prompt_tokens']:>8} {m['completion_tokens']:>7} "
+            f"{m['llm_round_trips']:>6} {m['turn_latency_mean_s']:>7.3f} {m['turn_latency_max_s']:>7.3f}"
+        )
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\n[ERROR] No baseline at {args.baseline}; run with --update-baseline first")
+        return 1
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nREGRESSION: {len(regressions)} metric(s) worse than baseline (tolerance {args.tolerance:.0%})")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+import os
+import re
+import sys
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+RESPONSE_CACHE_MAX_ENTRIES = 256
+RESPONSE_CACHE_TTL_S = 3600.0
+
+# Utterances that mention dates, times, names or booking actions are about
+# booking state and never use the cache.
+BOOKING_WORDS = re.compile(
+    r"\b(termin\w*|buch\w*|gebucht|verschieb\w*|stornier\w*|absag\w*|"
+    r"uhr|heute|morgen|übermorgen|montag|dienstag|mittwoch|donnerstag|"
+    r"freitag|samstag|sonntag|woche|datum|zeit\w*|frei|name|heiße|nummer)\b"
+)
+
+
+def normalize_utterance(text: str) -> str:
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def touches_booking(normalized: str) -> bool:
+    return bool(re.search(r"\d", normalized) or BOOKING_WORDS.search(normalized))
+
+
+class ResponseCache:
+    """LRU + TTL cache of complete answers to recurring questions.
+
+    Keys are (normalized utterance, context fingerprint) pairs built by the
+    caller; values are the spoken answer. Only turns that needed no tools are
+    stored, so a hit can be spoken without calling the LLM.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        ttl_s: float = RESPONSE_CACHE_TTL_S,
+    ):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    def get(self, key: Tuple[str, str]) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        stored_at, answer = entry
+        if time.monotonic() - stored_at > self.ttl_s:
+            del self._entries[key]
+            self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return answer
+
+    def put(self, key: Tuple[str, str], answer: str):
+        self._entries[key] = (time.monotonic(), answer)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def bypass(self):
+        self.stats["bypassed"] += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def memory_bytes(self) -> int:
+        return sum(
+            sys.getsizeof(key[0]) + sys.getsizeof(key[1]) + sys.getsizeof(answer)
+            for key, (_, answer) in self._entries.items()
+        )
+
+    def snapshot(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+            "memory_bytes": self.memory_bytes(),
+        }
+
+
+_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the worker-wide cache, or None when RESPONSE_CACHE_ENABLED=0."""
+    global _cache
+    if os.environ.get("RESPONSE_CACHE_ENABLED", "1") != "1":
+        return None
+    if _cache is None:
+        _cache = ResponseCache(
+            max_entries=int(
+                os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", RESPONSE_CACHE_MAX_ENTRIES)
+            ),
+            ttl_s=float(os.environ.get("RESPONSE_CACHE_TTL_S", RESPONSE_CACHE_TTL_S)),
+        )
+    return _cache
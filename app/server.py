@@ -1,6 +1,7 @@
 import json
 import os
 import asyncio
+from contextlib import aclosing, asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.responses import JSONResponse
@@ -10,13 +11,55 @@ from .custom_types import (
     ConfigResponse,
     ResponseRequiredRequest,
 )
+from .cal_client import get_cal_scheduler
+from .deadline import TurnDeadline
+from .llm_scheduler import get_llm_scheduler
+from .response_cache import get_response_cache
 from .llm_with_func_calling import LlmClient
+from .recorder import open_recorder
+from . import warmup
 
 load_dotenv()
-app = FastAPI()
+
+
+# Warm up in the background so the liveness of the process is visible right
+# away, while /ready keeps new calls away until the worker is warm.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    task = None
+    if os.environ.get("WARMUP_ENABLED", "1") == "1":
+        task = asyncio.create_task(warmup.warm_up())
+    else:
+        warmup.state["ready"] = True
+    yield
+    if task:
+        task.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
 retell = Retell(api_key=os.environ["RETELL_API_KEY"])
 
 
+# Readiness probe for the platform's load balancer.
+@app.get("/ready")
+async def ready():
+    if not warmup.state["ready"]:
+        return JSONResponse(status_code=503, content={"ready": False})
+    return JSONResponse(status_code=200, content={"ready": True})
+
+
+# Load and queueing counters of this worker's LLM and Cal.com schedulers and
+# its response cache.
+@app.get("/stats")
+async def stats():
+    response_cache = get_response_cache()
+    return {
+        "llm": get_llm_scheduler().snapshot(),
+        "cal": get_cal_scheduler().stats,
+        "response_cache": response_cache.snapshot() if response_cache else None,
+    }
+
+
 # Handle webhook from Retell server. This is used to receive events from Retell server.
 # Including call_started, call_ended, call_analyzed
 @app.post("/webhook")
@@ -56,9 +99,13 @@ async def handle_webhook(request: Request):
 # generating responses with LLM and send back to Retell server.
 @app.websocket("/llm-websocket/{call_id}")
 async def websocket_handler(websocket: WebSocket, call_id: str):
+    recorder = None
+    pending = set()
     try:
         await websocket.accept()
         llm_client = LlmClient()
+        recorder = open_recorder(call_id)
+        llm_client.recorder = recorder
 
         # Send optional config to Retell server
         config = ConfigResponse(
@@ -78,6 +125,8 @@ async def websocket_handler(websocket: WebSocket, call_id: str):
 
         async def handle_message(request_json):
             nonlocal response_id
+            if recorder:
+                recorder.frame(request_json)
 
             # There are 5 types of interaction_type: call_details, pingpong, update_only, response_required, and reminder_required.
             # Not all of them need to be handled, only response_required and reminder_required.
@@ -105,6 +154,8 @@ async def websocket_handler(websocket: WebSocket, call_id: str):
                 or request_json["interaction_type"] == "reminder_required"
             ):
                 response_id = request_json["response_id"]
+                # The turn budget starts as soon as Retell asks for a response.
+                deadline = TurnDeadline()
                 request = ResponseRequiredRequest(
                     interaction_type=request_json["interaction_type"],
                     response_id=response_id,
@@ -114,13 +165,21 @@ async def websocket_handler(websocket: WebSocket, call_id: str):
                     f"""Received interaction_type={request_json['interaction_type']}, response_id={response_id}, last_transcript={request_json['transcript'][-1]['content']}"""
                 )
 
-                async for event in llm_client.draft_response(request):
-                    await websocket.send_json(event.__dict__)
-                    if request.response_id < response_id:
-                        break  # new response needed, abandon this one
+                # Close the generator right away when abandoned so it gives
+                # back its LLM slot.
+                async with aclosing(
+                    llm_client.draft_response(request, deadline)
+                ) as events:
+                    async for event in events:
+                        warmup.record_first_turn(deadline.elapsed())
+                        await websocket.send_json(event.__dict__)
+                        if request.response_id < response_id:
+                            break  # new response needed, abandon this one
 
         async for data in websocket.iter_json():
-            asyncio.create_task(handle_message(data))
+            task = asyncio.create_task(handle_message(data))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
 
     except WebSocketDisconnect:
         print(f"LLM WebSocket disconnected for {call_id}")
@@ -130,4 +189,11 @@ async def websocket_handler(websocket: WebSocket, call_id: str):
         print(f"Error in LLM WebSocket: {e} for {call_id}")
         await websocket.close(1011, "Server error")
     finally:
+        if recorder:
+            # A turn can outlive the connection (e.g. a booking still waiting
+            # for Cal.com) and must still be able to record its result.
+            try:
+                await asyncio.gather(*pending, return_exceptions=True)
+            finally:
+                recorder.close()
         print(f"LLM WebSocket connection closed for {call_id}")
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import time
+
+from .custom_types import ResponseRequiredRequest
+from .llm_scheduler import PRIORITY_BACKGROUND
+from .llm_with_func_calling import LlmClient
+
+# Idle connections to the LLM provider and Cal.com are refreshed this often
+# so the first turn after a quiet period does not pay for a new handshake.
+KEEPALIVE_INTERVAL_S = 45.0
+WARMUP_TIMEOUT_S = 15.0
+
+state = {
+    "ready": False,
+    "warmup_s": None,
+    "first_turn_logged": False,
+}
+
+
+async def _ping_upstreams(llm_client: LlmClient):
+    # The Cal.com ping deliberately bypasses CalScheduler's bucket and stats:
+    # it is an unauthenticated HEAD on the API root, so it does not count
+    # against the per-key rate limit the bucket protects, and it only shares
+    # the scheduler's session to keep that connection warm.
+    results = await asyncio.gather(
+        llm_client.client.models.list(),
+        asyncio.to_thread(llm_client.cal.session.head, llm_client.cal_api_base, timeout=5),
+        return_exceptions=True,
+    )
+    for name, result in zip(("llm", "cal.com"), results):
+        if isinstance(result, Exception):
+            print(f"[WARN] Warm-up connection to {name} failed: {result}")
+
+
+async def warm_up():
+    """Prepare the worker for its first live call.
+
+    Builds the prompt and response models once, opens connections to the LLM
+    provider and Cal.com, and optionally sends a one-token completion
+    (WARMUP_COMPLETION=1). Failures are logged but never block readiness.
+    """
+    started = time.monotonic()
+    llm_client = None
+    try:
+        llm_client = LlmClient()
+        llm_client.prepare_prompt(
+            ResponseRequiredRequest(
+                interaction_type="response_required",
+                response_id=0,
+                transcript=[{"role": "user", "content": "Hallo"}],
+            )
+        )
+        llm_client.draft_begin_message()
+
+        await asyncio.wait_for(_ping_upstreams(llm_client), WARMUP_TIMEOUT_S)
+        if os.environ.get("WARMUP_COMPLETION") == "1":
+            async with llm_client.llm_scheduler.slot(
+                PRIORITY_BACKGROUND, timeout=WARMUP_TIMEOUT_S
+            ):
+                await asyncio.wait_for(
+                    llm_client.client.chat.completions.create(
+                        model=llm_client.model,
+                        messages=[{"role": "user", "content": "Hallo"}],
+                        max_tokens=1,
+                    ),
+                    WARMUP_TIMEOUT_S,
+                )
+    except Exception as e:
+        print(f"[WARN] Warm-up incomplete: {e}")
+    finally:
+        state["warmup_s"] = time.monotonic() - started
+        state["ready"] = True
+        print(f"[METRIC] warmup_done elapsed_s={state['warmup_s']:.2f}")
+
+    if llm_client is None:
+        return
+    while True:
+        await asyncio.sleep(KEEPALIVE_INTERVAL_S)
+        try:
+            await asyncio.wait_for(_ping_upstreams(llm_client), WARMUP_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            print(f"[WARN] Keep-alive ping timed out after {WARMUP_TIMEOUT_S:.1f}s")
+
+
+def record_first_turn(latency_s: float):
+    # The first turn a worker serves shows the cold-start cost; compare runs
+    # with WARMUP_ENABLED=0 and the default.
+    if state["first_turn_logged"]:
+        return
+    state["first_turn_logged"] = True
+    print(
+        f"[METRIC] worker_first_turn time_to_first_event_s={latency_s:.2f} "
+        f"warmed_up={state['warmup_s'] is not None}"
+    )
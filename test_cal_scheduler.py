@@ -0,0 +1,185 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from app.cal_client import CalQueueFullError, CalScheduler
+
+
+@contextmanager
+def mock_cal(script):
+    """Local stand-in for Cal.com.
+
+    script maps a path to a list of (status, headers, delay_s) answers that
+    are served in order; the last one repeats. Every hit is logged as
+    (method, path, time.monotonic()).
+    """
+    hits = []
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _answer(self):
+            path = self.path.split("?")[0]
+            with lock:
+                n = sum(1 for _, p, _ in hits if p == path)
+                hits.append((self.command, path, time.monotonic()))
+            answers = script[path]
+            status, headers, delay = answers[min(n, len(answers) - 1)]
+            if delay:
+                time.sleep(delay)
+            body = b'{"status": "ok"}'
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = _answer
+        do_POST = _answer
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}", hits
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _scheduler(**kwargs):
+    kwargs.setdefault("rate_per_s", 100)
+    kwargs.setdefault("burst", 10)
+    return CalScheduler(**kwargs)
+
+
+def _expires(seconds=5.0):
+    return time.monotonic() + seconds
+
+
+def test_429_retry_after_pauses_all_callers():
+    script = {
+        "/a": [(429, {"Retry-After": "0.5"}, 0), (200, {}, 0)],
+        "/b": [(200, {}, 0)],
+    }
+    with mock_cal(script) as (base, hits):
+        cal = _scheduler()
+        with ThreadPoolExecutor(2) as pool:
+            first = pool.submit(cal.get, f"{base}/a", {}, {}, _expires())
+            time.sleep(0.1)
+            second = pool.submit(cal.get, f"{base}/b", {}, {}, _expires())
+            assert first.result().status_code == 200
+            assert second.result().status_code == 200
+
+    rate_limited_at = hits[0][2]
+    b_at = next(t for _, path, t in hits if path == "/b")
+    # /b never had a 429 itself but still waited out /a's Retry-After.
+    assert b_at - rate_limited_at >= 0.45
+    assert cal.stats["rate_limited"] == 1
+
+
+def test_429_pauses_all_callers_beyond_the_callers_budget():
+    script = {
+        "/a": [(429, {"Retry-After": "30"}, 0)],
+        "/b": [(200, {}, 0)],
+    }
+    with mock_cal(script) as (base, hits):
+        cal = _scheduler()
+        # /a cannot wait 30s, so it gets the 429 back ...
+        assert cal.get(f"{base}/a", {}, {}, _expires(1.0)).status_code == 429
+        # ... but the window still holds back everyone else.
+        try:
+            cal.get(f"{base}/b", {}, {}, _expires(0.5))
+            raise AssertionError("/b was sent inside the Retry-After window")
+        except requests.Timeout:
+            pass
+    assert [path for _, path, _ in hits] == ["/a"]
+    assert cal.stats["retries"] == 0
+
+
+def test_reads_are_retried_on_5xx():
+    script = {"/slots": [(503, {}, 0), (200, {}, 0)]}
+    with mock_cal(script) as (base, hits):
+        cal = _scheduler()
+        response = cal.get(f"{base}/slots", {"eventTypeId": 1}, {}, _expires())
+    assert response.status_code == 200
+    assert len(hits) == 2
+    assert cal.stats["retries"] == 1
+
+
+def test_writes_are_not_retried_on_5xx():
+    script = {"/bookings": [(503, {}, 0), (200, {}, 0)]}
+    with mock_cal(script) as (base, hits):
+        cal = _scheduler()
+        response = cal.post(f"{base}/bookings", {}, {}, _expires())
+    assert response.status_code == 503
+    assert len(hits) == 1
+    assert cal.stats["retries"] == 0
+
+
+def test_identical_reads_are_coalesced():
+    n = 5
+    script = {"/slots": [(200, {}, 0.3)]}
+    with mock_cal(script) as (base, hits):
+        cal = _scheduler()
+        with ThreadPoolExecutor(n) as pool:
+            responses = list(pool.map(
+                lambda _: cal.get(f"{base}/slots", {"eventTypeId": 1}, {}, _expires()),
+                range(n),
+            ))
+    assert [r.status_code for r in responses] == [200] * n
+    assert len(hits) == 1
+    assert cal.stats["coalesced"] == n - 1
+
+
+def test_write_queue_is_bounded():
+    script = {"/bookings": [(200, {}, 0.5)]}
+    with mock_cal(script) as (base, hits):
+        cal = _scheduler(max_pending_writes=1)
+        with ThreadPoolExecutor(1) as pool:
+            pending = pool.submit(cal.post, f"{base}/bookings", {}, {}, _expires())
+            time.sleep(0.1)
+            try:
+                cal.post(f"{base}/bookings", {}, {}, _expires())
+                raise AssertionError("second write was not rejected")
+            except CalQueueFullError:
+                pass
+            assert pending.result().status_code == 200
+    assert len(hits) == 1
+    assert cal.stats["writes_rejected"] == 1
+
+
+def test_coalesced_follower_times_out_on_its_own_budget():
+    script = {"/slots": [(200, {}, 1.0)]}
+    with mock_cal(script) as (base, hits):
+        cal = _scheduler()
+        with ThreadPoolExecutor(1) as pool:
+            leader = pool.submit(cal.get, f"{base}/slots", {}, {}, _expires())
+            time.sleep(0.1)
+            started = time.monotonic()
+            try:
+                cal.get(f"{base}/slots", {}, {}, _expires(0.2))
+                raise AssertionError("follower did not time out")
+            except requests.Timeout:
+                pass
+            assert time.monotonic() - started < 0.5
+            assert leader.result().status_code == 200
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in list(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for name, fn in tests:
+        try:
+            fn()
+            print(f"✅ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {name}: {e!r}")
+    raise SystemExit(1 if failed else 0)
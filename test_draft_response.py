@@ -0,0 +1,196 @@
+import asyncio
+import contextlib
+import io
+import json
+import os
+import time
+from types import SimpleNamespace
+
+from app.custom_types import ResponseRequiredRequest, Utterance
+from app.deadline import TurnDeadline
+from app.llm_with_func_calling import LlmClient, begin_sentence, fallback_sentence
+from app.replay import ReplayStream
+from app.response_cache import ResponseCache
+
+# The stand-in LLM never reaches a provider, but LlmClient wants a key.
+os.environ.setdefault("OPENROUTER_API_KEY", "test")
+
+BOOKING_ARGS = json.dumps({
+    "eventTypeId": 123456,
+    "start": "2025-01-07T09:00:00Z",
+    "attendee_name": "Max Mustermann",
+})
+
+
+def _chunk(content=None, tool_calls=None):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(delta=SimpleNamespace(content=content, tool_calls=tool_calls))]
+    )
+
+
+def _tool_call(name, arguments, index=0):
+    return SimpleNamespace(
+        index=index,
+        id=f"call_{index}",
+        function=SimpleNamespace(name=name, arguments=arguments),
+    )
+
+
+class ScriptedLlm:
+    """Stands in for AsyncOpenAI; answer(round, tools) returns the chunks of a round."""
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.chat = SimpleNamespace(completions=self)
+        self.calls = []
+
+    async def create(self, model, messages, stream=False, tools=None, **kwargs):
+        self.calls.append({"messages": messages, "tools": tools})
+        return ReplayStream(self.answer(len(self.calls), tools))
+
+
+def _client(answer):
+    client = LlmClient()
+    client.response_cache = None
+    client.client = ScriptedLlm(answer)
+    return client
+
+
+def _request(response_id, *turns):
+    return ResponseRequiredRequest(
+        interaction_type="response_required",
+        response_id=response_id,
+        transcript=[Utterance(role=role, content=content) for role, content in turns],
+    )
+
+
+def _draft(client, request, budget_s=30.0):
+    async def run():
+        return [r async for r in client.draft_response(request, TurnDeadline(budget_s=budget_s))]
+    return asyncio.run(run())
+
+
+def _spoken(responses):
+    return "".join(r.content for r in responses)
+
+
+def test_tool_rounds_are_a_hard_limit():
+    # A model that asks for a booking no matter whether tools are offered.
+    client = _client(lambda round_no, tools: [
+        _chunk(tool_calls=[_tool_call("book_appointment_cal", BOOKING_ARGS)])
+    ])
+    booked = []
+    client._book = lambda *args: booked.append(args) or {"status": "success"}
+
+    responses = _draft(client, _request(1, ("user", "Buchen Sie bitte morgen um 10 Uhr.")))
+
+    assert len(client.client.calls) == client.max_tool_rounds + 1
+    assert client.client.calls[-1]["tools"] is None
+    assert len(booked) == client.max_tool_rounds
+    assert responses[-1].content_complete
+
+
+def _served_from_cache(cache, transcript):
+    client = _client(lambda round_no, tools: [_chunk(content="Gerne, an welchem Tag passt es Ihnen?")])
+    client.response_cache = cache
+    _draft(client, _request(1, *transcript))
+    return not client.client.calls
+
+
+def _assert_booking_context_bypasses_cache(agent_question):
+    cache = ResponseCache()
+    faq_call = [
+        ("agent", begin_sentence),
+        ("user", "Was ist die Demo?"),
+        ("agent", agent_question),
+        ("user", "Ja, gerne."),
+    ]
+    booking_call = [
+        ("agent", begin_sentence),
+        ("user", "Ich will am Donnerstag um 10 Uhr eine Demo."),
+        ("agent", agent_question),
+        ("user", "Ja, gerne."),
+    ]
+    _served_from_cache(cache, faq_call)
+    assert not _served_from_cache(cache, booking_call)
+    return cache, faq_call
+
+
+def test_reply_to_booking_question_bypasses_cache():
+    cache, faq_call = _assert_booking_context_bypasses_cache(
+        "Möchten Sie dafür einen Termin buchen?"
+    )
+    assert not _served_from_cache(cache, faq_call)
+
+
+def test_earlier_booking_details_bypass_cache():
+    cache, faq_call = _assert_booking_context_bypasses_cache(
+        "Eine Vorführung unserer Assistentin. Möchten Sie eine vereinbaren?"
+    )
+    # The same exchange without booking details is still a cache hit.
+    assert _served_from_cache(cache, faq_call)
+
+
+def test_write_timeout_is_reported_as_unknown():
+    client = _client(lambda round_no, tools: (
+        [_chunk(tool_calls=[_tool_call("book_appointment_cal", BOOKING_ARGS)])]
+        if round_no == 1
+        else [_chunk(content="Ich konnte das gerade nicht bestätigen.")]
+    ))
+
+    def slow_book(*args):
+        time.sleep(1.5)
+        return {"status": "success", "data": {"uid": "bk_late"}}
+
+    client._book = slow_book
+    request = _request(1, ("user", "Buchen Sie bitte morgen um 10 Uhr."))
+    log = io.StringIO()
+
+    async def run():
+        with contextlib.redirect_stdout(log):
+            # 3.8s minus the 3s answer reserve leaves Cal.com well under 1.5s.
+            async for _ in client.draft_response(request, TurnDeadline(budget_s=3.8)):
+                pass
+            # The booking lands after the turn gave up on it.
+            await asyncio.sleep(1.5)
+    asyncio.run(run())
+
+    tool_message = client.client.calls[1]["messages"][-1]
+    assert tool_message["role"] == "tool"
+    assert tool_message["content"].startswith("UNKNOWN")
+    assert "Do NOT call book_appointment_cal again" in tool_message["content"]
+    assert fallback_sentence not in tool_message["content"]
+    assert "book_appointment_cal finished after its timeout" in log.getvalue()
+    assert "bk_late" in log.getvalue()
+
+
+def test_deadline_fallback_is_separated_from_spoken_text():
+    client = _client(lambda round_no, tools: [
+        _chunk(content="Einen Moment."),
+        _chunk(tool_calls=[_tool_call("check_availability_cal", "{}")]),
+    ])
+    client.answer_reserve_s = 0.1
+
+    async def slow_tool(func_name, arguments, deadline):
+        # Uses up the rest of the turn, so the next round never starts.
+        await asyncio.sleep(deadline.remaining() + 0.05)
+        return "API Result: {}", False
+
+    client._execute_tool = slow_tool
+    responses = _draft(client, _request(1, ("user", "Ist morgen etwas frei?")), budget_s=0.5)
+
+    assert _spoken(responses) == f"Einen Moment. {fallback_sentence}"
+    assert len(client.client.calls) == 1
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in list(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for name, fn in tests:
+        try:
+            fn()
+            print(f"✅ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {name}: {e!r}")
+    raise SystemExit(1 if failed else 0)